@@ -0,0 +1,127 @@
+import csv
+import json
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Upper edges, in feet, of the distance-to-nearest-avoid-point bands.
+DISTANCE_BANDS = (1500, 2500, 5000, 10000, 20000)
+
+
+def compute_statistics(address_store, target_mask, zip_field, risk_masks, avoid_store=None,
+                       distance_bands=DISTANCE_BANDS):
+    """
+        Computes the run statistics in one vectorized pass over the address store.
+        Every aggregate is a bincount over integer keys, so the cost is a few array
+        operations regardless of the number of addresses.
+
+        The spray area is the intersection of every risk buffer less the avoid buffer,
+        so in 'by_risk_combination' only the all-layers row has targets; the other rows
+        show how many addresses each partial combination of risk layers covers without
+        qualifying for spraying. When the risk masks are not available the breakdown is
+        None rather than a table that puts every address under "none".
+
+        Args:
+            address_store (AddressStore): Store of all addresses considered for spraying.
+            target_mask (numpy.ndarray): Boolean array, True for addresses in the spray set.
+            zip_field (str): Encoded text column of the store holding the ZIP code.
+            risk_masks (dict): Risk layer name -> boolean array, True for addresses inside that
+                layer's buffer, or None when they could not be computed.
+            avoid_store (AddressStore): Optional store of avoid points, in the same coordinate system.
+            distance_bands (tuple): Upper edges, in feet, of the distance bands.
+
+        Returns:
+            dict: Totals and the 'by_zip', 'by_risk_combination' and 'by_avoid_distance' breakdowns.
+    """
+    target_mask = np.asarray(target_mask, dtype=bool)
+
+    stats = {
+        "total_addresses": int(len(address_store)),
+        "target_addresses": int(np.count_nonzero(target_mask)),
+        "by_zip": _count_by_zip(address_store, target_mask, zip_field),
+        "by_risk_combination": None,
+        "by_avoid_distance": [],
+    }
+    if risk_masks is not None:
+        stats["by_risk_combination"] = _count_by_risk_combination(target_mask, risk_masks)
+    if avoid_store is not None and len(avoid_store):
+        stats["by_avoid_distance"] = _count_by_avoid_distance(
+            address_store, target_mask, avoid_store, distance_bands
+        )
+    return stats
+
+
+def write_statistics(stats, csv_path, json_path):
+    """
+        Writes the statistics as a flat summary table and as JSON. A missing risk
+        combination breakdown has no rows in the table and is null in the JSON.
+
+        Args:
+            stats (dict): Output of compute_statistics().
+            csv_path (str): Full path to the summary CSV file.
+            json_path (str): Full path to the JSON file.
+    """
+    with open(csv_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["group", "key", "addresses", "targets"])
+        writer.writerow(["total", "", stats["total_addresses"], stats["target_addresses"]])
+        for row in stats["by_zip"]:
+            writer.writerow(["zip", row["zip"], row["addresses"], row["targets"]])
+        for row in stats["by_risk_combination"] or []:
+            writer.writerow(["risk_combination", "+".join(row["layers"]) or "none",
+                             row["addresses"], row["targets"]])
+        for row in stats["by_avoid_distance"]:
+            writer.writerow(["avoid_distance", f"{row['min_feet']}-{row['max_feet'] or ''}",
+                             "", row["targets"]])
+
+    with open(json_path, "w", encoding="utf-8") as file:
+        json.dump(stats, file, indent=2)
+
+
+def _count_by_zip(address_store, target_mask, zip_field):
+    codes = address_store.columns[zip_field]
+    vocab = address_store.vocabulary(zip_field)
+    addresses = np.bincount(codes, minlength=len(vocab))
+    targets = np.bincount(codes[target_mask], minlength=len(vocab))
+    return [
+        {"zip": vocab[code], "addresses": int(addresses[code]), "targets": int(targets[code])}
+        for code in np.flatnonzero(addresses)
+    ]
+
+
+def _count_by_risk_combination(target_mask, risk_masks):
+    layers = list(risk_masks.keys())
+    # Each address gets a bit per risk layer; the combination is the resulting integer.
+    keys = np.zeros(len(target_mask), dtype=np.int64)
+    for bit, layer in enumerate(layers):
+        keys |= np.asarray(risk_masks[layer], dtype=np.int64) << bit
+
+    addresses = np.bincount(keys, minlength=1 << len(layers))
+    targets = np.bincount(keys[target_mask], minlength=1 << len(layers))
+    return [
+        {
+            "layers": [layer for bit, layer in enumerate(layers) if key >> bit & 1],
+            "addresses": int(addresses[key]),
+            "targets": int(targets[key]),
+        }
+        for key in np.flatnonzero(addresses)
+    ]
+
+
+def _count_by_avoid_distance(address_store, target_mask, avoid_store, distance_bands):
+    avoid_xy = np.column_stack((avoid_store.columns["x"], avoid_store.columns["y"]))
+    avoid_xy = avoid_xy[np.isfinite(avoid_xy).all(axis=1)]
+    target_xy = np.column_stack((address_store.columns["x"][target_mask],
+                                 address_store.columns["y"][target_mask]))
+    target_xy = target_xy[np.isfinite(target_xy).all(axis=1)]
+    if not len(avoid_xy) or not len(target_xy):
+        return []
+
+    distances, _ = cKDTree(avoid_xy).query(target_xy)
+    bands = np.searchsorted(np.asarray(distance_bands, dtype=np.float64), distances, side="right")
+    targets = np.bincount(bands, minlength=len(distance_bands) + 1)
+
+    edges = (0,) + tuple(distance_bands) + (None,)
+    return [
+        {"min_feet": edges[i], "max_feet": edges[i + 1], "targets": int(targets[i])}
+        for i in range(len(targets))
+    ]
@@ -0,0 +1,347 @@
+import os
+import re
+import csv
+import json
+import uuid
+import shutil
+import hashlib
+from array import array
+import numpy as np
+from etl.LazyImport import lazy_import
+
+# Imported on first use, so worker processes that only read a saved store do
+# not pay for loading arcpy.
+arcpy = lazy_import("arcpy")
+
+# Names of the version directories save() writes: uuid4().hex.
+_VERSION = re.compile(r"[0-9a-f]{32}")
+
+
+class AddressStore:
+    """
+        AddressStore keeps address points in a compact columnar layout instead of
+        one dict per row.
+
+        Coordinates and object ids live in contiguous numpy arrays. Text columns
+        (street address, zip code) are dictionary-encoded: each row stores an
+        int32 code and every distinct value is kept once in a UTF-8 blob with an
+        offsets array. A saved store is a directory of .npy files plus a small
+        meta.json; loading it memory-maps the arrays, so several worker processes
+        reading the same store share one copy through the OS page cache. Each save
+        writes a new version directory and then switches a CURRENT file to it, so a
+        store is never seen half-written.
+
+        Attributes:
+            columns (dict): Column name -> numpy array. Numeric columns hold values,
+                encoded text columns hold int32 codes.
+            vocabularies (dict): Text column name -> (offsets, blob) tuple holding the
+                distinct values for that column.
+    """
+
+    def __init__(self, columns, vocabularies=None):
+        """
+                Initialize the AddressStore.
+
+                Args:
+                    columns (dict): Column name -> numpy array. Must include 'oid', 'x' and 'y'.
+                    vocabularies (dict): Text column name -> (offsets, blob) tuple.
+        """
+        self.columns = columns
+        self.vocabularies = vocabularies or {}
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self.columns["oid"])
+
+    @property
+    def text_fields(self):
+        return list(self.vocabularies.keys())
+
+    @classmethod
+    def from_feature_class(cls, fc, text_fields, spatial_reference=None):
+        """
+                Streams a point feature class into a store with an arcpy.da cursor.
+
+                Args:
+                    fc (str): Input point feature class.
+                    text_fields (list): Attribute fields to keep, dictionary-encoded.
+                    spatial_reference (arcpy.SpatialReference): Optional coordinate system the
+                        x and y values are projected to. Defaults to that of the feature class.
+        """
+        builder = _ColumnBuilder(text_fields)
+        fields = ["OID@", "SHAPE@X", "SHAPE@Y"] + list(text_fields)
+        with arcpy.da.SearchCursor(fc, fields, spatial_reference=spatial_reference) as cursor:
+            for row in cursor:
+                builder.append(row[0], row[1], row[2], row[3:])
+        return builder.build()
+
+    def save(self, path):
+        """
+                Writes the store as a new version directory of .npy files under path and
+                atomically points path's CURRENT file at it with os.replace. Readers see
+                either the previous version or this one, and a store that is still
+                memory-mapped is never overwritten. Older versions, and CURRENT temp files
+                left by an interrupted save, are removed when the OS allows it; a version
+                still mapped on Windows is left for a later save. Nothing else under path
+                is touched.
+
+                Args:
+                    path (str): Store directory. Created if it does not exist.
+        """
+        version = uuid.uuid4().hex
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+        for name, values in self.columns.items():
+            np.save(os.path.join(version_path, f"{name}.npy"), values)
+        for name, (offsets, blob) in self.vocabularies.items():
+            np.save(os.path.join(version_path, f"{name}.offsets.npy"), offsets)
+            np.save(os.path.join(version_path, f"{name}.blob.npy"), blob)
+        meta = {
+            "rows": len(self),
+            "columns": list(self.columns.keys()),
+            "text_fields": self.text_fields,
+        }
+        with open(os.path.join(version_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        current_tmp = os.path.join(path, f"CURRENT.{version}")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(path, "CURRENT"))
+
+        for name in os.listdir(path):
+            old_path = os.path.join(path, name)
+            if name == version:
+                continue
+            if _VERSION.fullmatch(name) and os.path.isdir(old_path):
+                shutil.rmtree(old_path, ignore_errors=True)
+            elif name.startswith("CURRENT.") and _VERSION.fullmatch(name[len("CURRENT."):]):
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+                Opens the current version of a store written by save().
+
+                Args:
+                    path (str): Store directory.
+                    mmap (bool): Memory-map the arrays read-only instead of reading them into memory.
+        """
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, "CURRENT"), "r", encoding="utf-8") as f:
+            path = os.path.join(path, f.read().strip())
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        columns = {}
+        for name in meta["columns"]:
+            columns[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        vocabularies = {}
+        for name in meta["text_fields"]:
+            offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mmap_mode)
+            blob = np.load(os.path.join(path, f"{name}.blob.npy"), mmap_mode=mmap_mode)
+            vocabularies[name] = (offsets, blob)
+        return cls(columns, vocabularies)
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, "CURRENT"))
+
+    def vocabulary(self, name):
+        """
+                Returns the distinct values of an encoded text column, indexed by code.
+
+                Args:
+                    name (str): Text column name.
+        """
+        if name not in self._decoded:
+            offsets, blob = self.vocabularies[name]
+            data = bytes(blob)
+            self._decoded[name] = [
+                data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)
+            ]
+        return self._decoded[name]
+
+    def decode(self, name):
+        """
+                Returns the values of a text column as a list in row order. Only the
+                codes that occur in this store are decoded, so exporting a small
+                subset of a large store stays cheap.
+
+                Args:
+                    name (str): Text column name.
+        """
+        used, inverse = np.unique(self.columns[name], return_inverse=True)
+        strings = self._strings(name, used)
+        return [strings[i] for i in inverse]
+
+    def compact(self):
+        """
+                Returns a copy whose vocabularies hold only the values used by its rows,
+                e.g. so a small subset taken from a large store is saved without the
+                large store's full vocabulary.
+        """
+        columns = dict(self.columns)
+        vocabularies = {}
+        for name in self.text_fields:
+            used, inverse = np.unique(self.columns[name], return_inverse=True)
+            columns[name] = inverse.reshape(-1).astype(np.int32)
+            vocabularies[name] = _pack(self._strings(name, used))
+        return AddressStore(columns, vocabularies)
+
+    def _strings(self, name, codes):
+        offsets, blob = self.vocabularies[name]
+        return [bytes(blob[offsets[code]:offsets[code + 1]]).decode("utf-8") for code in codes]
+
+    def take(self, selection):
+        """
+                Returns a new in-memory store holding only the selected rows.
+                Vocabularies are shared with this store, not copied.
+
+                Args:
+                    selection (numpy.ndarray): Boolean mask or integer row indexes.
+        """
+        columns = {name: np.asarray(values[selection]) for name, values in self.columns.items()}
+        subset = AddressStore(columns, self.vocabularies)
+        subset._decoded = self._decoded
+        return subset
+
+    def select_oids(self, oids):
+        """
+                Returns the rows whose object id is in oids, e.g. the TARGET_FID values
+                of a spatial join output.
+
+                Args:
+                    oids (sequence): Object ids to keep.
+        """
+        return self.take(np.isin(self.columns["oid"], np.asarray(oids, dtype=np.int64)))
+
+    def address_ids(self, fields):
+        """
+                Returns a stable 64-bit id per row, hashed from the normalized values of
+                the given text columns. Unlike object ids, the id of an address does not
+                change when the feature class is rebuilt. Each distinct value used by the
+                rows is hashed once, so the cost follows the size of this store rather than
+                of a shared vocabulary, and the per-column hashes are combined with array
+                arithmetic.
+
+                Args:
+                    fields (list): Text columns that identify an address, e.g. street and zip code.
+
+                Returns:
+                    numpy.ndarray: uint64 ids aligned with the store rows.
+        """
+        ids = np.zeros(len(self), dtype=np.uint64)
+        for name in fields:
+            used, inverse = np.unique(self.columns[name], return_inverse=True)
+            hashes = np.array([_hash(value) for value in self._strings(name, used)], dtype=np.uint64)
+            ids = ids * np.uint64(0x100000001B3) ^ hashes[inverse.reshape(-1)]
+        return ids
+
+    def indexed(self, fields):
+        """
+                Returns a compacted copy of the store with an 'address_id' column, sorted
+                by it, so it can be diffed against another indexed store with a sorted merge.
+
+                Args:
+                    fields (list): Text columns passed to address_ids().
+        """
+        ids = self.address_ids(fields)
+        order = np.argsort(ids, kind="stable")
+        index = self.take(order).compact()
+        index.columns["address_id"] = ids[order]
+        return index
+
+    def diff(self, previous):
+        """
+                Compares this indexed store with the indexed store of a previous run.
+
+                Args:
+                    previous (AddressStore): Indexed store of the previous run.
+
+                Returns:
+                    tuple: (added, removed) stores holding the rows whose address id is
+                    only in this store and only in the previous store respectively.
+        """
+        current_ids = self.columns["address_id"]
+        previous_ids = previous.columns["address_id"]
+        return (self.take(~_sorted_contains(previous_ids, current_ids)),
+                previous.take(~_sorted_contains(current_ids, previous_ids)))
+
+    def to_csv(self, csv_path, fields):
+        """
+                Writes the selected text columns to a CSV file.
+
+                Args:
+                    csv_path (str): Full path to the output CSV file.
+                    fields (list): Text columns to write, in order.
+        """
+        decoded = [self.decode(name) for name in fields]
+        with open(csv_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(fields)
+            writer.writerows(zip(*decoded))
+
+
+class _ColumnBuilder:
+    """
+        Accumulates rows into typed buffers and dictionary-encodes text values
+        as they arrive, so no per-row dict or list of Python objects is kept.
+    """
+
+    def __init__(self, text_fields):
+        self.text_fields = list(text_fields)
+        self.oid = array("q")
+        self.x = array("d")
+        self.y = array("d")
+        self.codes = [array("i") for _ in self.text_fields]
+        self.lookups = [{} for _ in self.text_fields]
+
+    def append(self, oid, x, y, texts):
+        self.oid.append(oid)
+        self.x.append(np.nan if x is None else x)
+        self.y.append(np.nan if y is None else y)
+        for codes, lookup, value in zip(self.codes, self.lookups, texts):
+            value = "" if value is None else str(value).strip()
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes.append(code)
+
+    def build(self):
+        columns = {
+            "oid": np.frombuffer(self.oid, dtype=np.int64),
+            "x": np.frombuffer(self.x, dtype=np.float64),
+            "y": np.frombuffer(self.y, dtype=np.float64),
+        }
+        vocabularies = {}
+        for name, codes, lookup in zip(self.text_fields, self.codes, self.lookups):
+            columns[name] = np.frombuffer(codes, dtype=np.int32)
+            vocabularies[name] = _pack(lookup.keys())
+        return AddressStore(columns, vocabularies)
+
+
+def _pack(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+    return offsets, blob
+
+
+def _hash(value):
+    normalized = " ".join(value.upper().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _sorted_contains(sorted_ids, ids):
+    # Merge-style membership test: both inputs are sorted, so one searchsorted
+    # pass finds where each id would sit in sorted_ids.
+    positions = np.searchsorted(sorted_ids, ids)
+    found = np.zeros(len(ids), dtype=bool)
+    inside = positions < len(sorted_ids)
+    found[inside] = sorted_ids[positions[inside]] == ids[inside]
+    return found
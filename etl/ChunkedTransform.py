@@ -0,0 +1,215 @@
+import io
+import os
+import csv
+import mmap
+import numpy as np
+
+# Default target size of the byte ranges a CSV file is split into.
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Size of the blocks split_csv scans for row boundaries at a time.
+SCAN_BYTES = 16 * 1024 * 1024
+
+_QUOTE = ord('"')
+# Bytes after which a quote opens a quoted field rather than being literal.
+_FIELD_START = np.zeros(256, dtype=bool)
+_FIELD_START[list(b",\r\n")] = True
+
+
+def single_line(row, index):
+    """
+        Row function that builds the 'SingleLine' geocoding address from the
+        'Street Address' and 'ZipCode' columns.
+
+        Args:
+            row (list): Parsed CSV row.
+            index (dict): Column name -> position in row.
+    """
+    street = row[index["Street Address"]].strip() if "Street Address" in index else ""
+    zipcode = row[index["ZipCode"]].strip() if "ZipCode" in index else ""
+    return [f"{street}, Boulder CO {zipcode}"]
+
+
+def split_csv(input_csv, chunk_bytes=CHUNK_BYTES):
+    """
+        Reads the header of a CSV file and splits the rest into byte ranges of
+        roughly chunk_bytes that end on row boundaries.
+
+        Args:
+            input_csv (str): Path to the CSV file.
+            chunk_bytes (int): Target size of each range in bytes.
+
+        Returns:
+            tuple: (header, ranges) where header is the list of column names and
+            ranges is a list of (start, end) byte offsets.
+    """
+    with open(input_csv, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise ValueError(f"{input_csv} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header_end, ranges, closed = _split_ranges(data, chunk_bytes)
+    if not closed:
+        # An unterminated quoted field leaves the row boundaries after it
+        # ambiguous, so the rows are kept in a single range.
+        ranges = [(header_end, size)] if header_end < size else []
+
+    header = next(csv.reader(_text(_read_range(input_csv, 0, header_end))))
+    return header, ranges
+
+
+def transform_range(input_csv, start, end, header, row_function):
+    """
+        Transforms the rows in one byte range of a CSV file and returns them as
+        encoded CSV text with the new values appended to each row.
+
+        Args:
+            input_csv (str): Path to the CSV file.
+            start (int): Offset of the first byte of the range.
+            end (int): Offset just past the last byte of the range.
+            header (list): Column names of the file.
+            row_function (callable): Module-level function (row, index) -> list of new values.
+    """
+    index = {name: i for i, name in enumerate(header)}
+    width = len(header)
+    rows = []
+    for row in csv.reader(_text(_read_range(input_csv, start, end))):
+        # Blank lines are skipped as csv.DictReader does. Short rows are padded with
+        # empty values, where the old DictReader loop failed on their None fields.
+        # Long rows are rejected as the DictWriter did, since appending to them
+        # would put the new values under the wrong columns.
+        if not row:
+            continue
+        if len(row) > width:
+            raise ValueError(f"{input_csv}: row has {len(row)} fields but the header has {width}: {row}")
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        rows.append(row + row_function(row, index))
+    return write_rows(rows)
+
+
+def write_rows(rows):
+    """
+        Encodes rows as UTF-8 CSV text, in the csv module's default dialect.
+
+        Args:
+            rows (list): Rows to encode.
+    """
+    buffer = io.StringIO(newline="")
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _read_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def _text(block):
+    # Universal newlines, matching a file opened in text mode.
+    return io.StringIO(block.decode("utf-8"), newline=None)
+
+
+def _split_ranges(data, chunk_bytes):
+    """
+        Returns (header_end, ranges, closed): the end of the first row, the byte
+        ranges of roughly chunk_bytes after it that end on row boundaries, and
+        whether every quoted field was closed.
+    """
+    size = len(data)
+    ends = []
+    # Where to look for the next row boundary: the end of the header row, then
+    # chunk_bytes past the end of each range.
+    position = 0
+    closed = True
+    for block in _quote_blocks(data, SCAN_BYTES):
+        closed = not block.inside_after
+        while position < block.end:
+            boundary = block.next_row_boundary(data, position)
+            if boundary is None:
+                position = block.end
+                break
+            ends.append(boundary)
+            position = boundary + chunk_bytes
+    if not ends:
+        return size, [], closed
+    if ends[-1] < size:
+        ends.append(size)
+    return ends[0], list(zip(ends[:-1], ends[1:])), closed
+
+
+def _quote_blocks(data, scan_bytes):
+    """
+        Scans data in blocks of about scan_bytes and yields a _QuoteBlock for each,
+        carrying the in-quotes state from one block to the next.
+    """
+    size = len(data)
+    inside = False
+    start = 0
+    while start < size:
+        end = min(start + scan_bytes, size)
+        # Keep runs of quotes whole so each block is classified on its own.
+        while end < size and data[end] == _QUOTE:
+            end += 1
+        block = _QuoteBlock(data, start, end, inside)
+        yield block
+        inside = block.inside_after
+        start = end
+
+
+class _QuoteBlock:
+    """
+        The runs of adjacent quotes in data[start:end] and whether each leaves the
+        scan inside a quoted field.
+
+        Only quotes change whether a newline is inside a quoted field, so the runs
+        are classified with array operations instead of a loop over the fields. A run
+        inside a quoted field is an escaped quote pair when even and closes the field
+        when odd. A run outside one opens a field when odd and at the start of a
+        field, as csv.reader sees it; otherwise it is literal or an empty quoted
+        field. Every run therefore keeps, toggles or resets the in-quotes state, and
+        the state after a run is the parity of the toggles since the last reset.
+    """
+
+    def __init__(self, data, start, end, inside):
+        self.start = start
+        self.end = end
+        self.inside_before = inside
+        block = np.frombuffer(data[start:end], dtype=np.uint8)
+        quotes = np.flatnonzero(block == _QUOTE)
+        first = np.ones(len(quotes), dtype=bool)
+        first[1:] = np.diff(quotes) != 1
+        self.runs = quotes[first]
+        odd = np.diff(np.append(np.flatnonzero(first), len(quotes))) % 2 == 1
+        opens = _FIELD_START[block[np.maximum(self.runs - 1, 0)]]
+        opens[self.runs == 0] = start == 0 or bool(_FIELD_START[data[start - 1]])
+
+        toggles = np.cumsum(odd & opens)
+        resets = odd & ~opens
+        last_reset = np.maximum.accumulate(np.where(resets, np.arange(len(self.runs)), -1))
+        base = np.where(last_reset >= 0, toggles[np.maximum(last_reset, 0)], -int(inside))
+        self.in_quotes = (toggles - base) % 2 == 1
+        self.inside_after = bool(self.in_quotes[-1]) if len(self.runs) else inside
+        # Index of the first run at or after each run that leaves the field closed.
+        self.next_closed = np.minimum.accumulate(
+            np.where(self.in_quotes, len(self.runs), np.arange(len(self.runs)))[::-1]
+        )[::-1]
+
+    def next_row_boundary(self, data, position):
+        """
+            Returns the offset just past the first newline in the block at or after
+            position that is not inside a quoted field, or None if there is none.
+        """
+        while True:
+            newline = data.find(b"\n", position, self.end)
+            if newline == -1:
+                return None
+            run = int(np.searchsorted(self.runs, newline - self.start)) - 1
+            if not (self.in_quotes[run] if run >= 0 else self.inside_before):
+                return newline + 1
+            # Skip to the run of quotes that closes the field.
+            run = self.next_closed[run + 1] if run + 1 < len(self.runs) else len(self.runs)
+            if run == len(self.runs):
+                return None
+            position = self.start + int(self.runs[run])
@@ -1,8 +1,14 @@
+import os
 import requests
-import arcpy
 import csv
 import shutil
 from etl.SpatialEtl import SpatialEtl
+from etl.AddressStore import AddressStore
+from etl.ChunkedTransform import CHUNK_BYTES, split_csv, transform_range, write_rows, single_line
+from etl.LazyImport import lazy_import
+
+# Imported on first use, so the transform worker processes do not load arcpy.
+arcpy = lazy_import("arcpy")
 
 
 class GSheetsEtl(SpatialEtl):
@@ -17,10 +23,25 @@ class GSheetsEtl(SpatialEtl):
             3. Performing address geocoding using an online locator service.
             4. Saving geocoded features to a geodatabase.
 
+        The downloaded sheet is processed in byte-range batches through the SpatialEtl
+        pipeline. Transform is CPU-bound; a sheet that spans more than one range is
+        transformed in 'transform_workers' processes, a smaller one in-process.
+        A single loader writes the blocks back in order.
+
+        Only the transform and write-back overlap. The sheet is downloaded
+        in full before it is split, since row boundaries are found by scanning the
+        whole file, and geocoding stays one whole-dataset step in finish(): a single
+        GeocodeAddresses call writes the one output feature class that 'avoid_points'
+        and the address store are built from, where geocoding each batch would need
+        a call, an intermediate feature class and a merge per batch.
+
         Attributes:
             config_dict (dict): Dictionary containing paths, URLs, and configuration parameters.
         """
 
+    transform_workers = 0
+    ordered_load = True
+
     def __init__(self, config_dict):
         """
                 Initialize the GSheetsEtl class.
@@ -31,62 +52,108 @@ class GSheetsEtl(SpatialEtl):
                         - 'proj_dir': Path to the local project directory.
         """
         self.config_dict = config_dict
+        self.header = None
+        self._outfile = None
         super().__init__(config_dict)
 
+    def begin(self):
+        """
+                Resets the per-run output file.
+        """
+        print("Running GSheets ETL pipeline...")
+        self._outfile = None
+
     def extract(self):
         """
                 Downloads a CSV file from a public Google Sheets link and saves it locally.
                 The file is named 'addresses.csv' and stored in the specified project directory.
+                Yields the file as (start, end) byte ranges of whole rows.
         """
         print("Extracting from Google Sheets...")
         remote_url = self.config_dict.get('remote_url')
         local_csv_path = f"{self.config_dict.get('proj_dir')}addresses.csv"
 
-        r = requests.get(remote_url)
-        r.encoding = "utf-8"
+        with requests.get(remote_url, stream=True) as r:
+            if r.status_code != 200:
+                print(f"Failed to download data. Status code: {r.status_code}")
+                return
+            with open(local_csv_path, "wb") as output_file:
+                for block in r.iter_content(chunk_size=1024 * 1024):
+                    output_file.write(block)
+        print(f"Data saved to {local_csv_path}")
 
-        if r.status_code == 200:
-            with open(local_csv_path, "w", encoding="utf-8") as output_file:
-                output_file.write(r.text)
-            print(f"Data saved to {local_csv_path}")
-        else:
-            print(f"Failed to download data. Status code: {r.status_code}")
+        self.header, ranges = split_csv(local_csv_path, self.config_dict.get('chunk_bytes') or CHUNK_BYTES)
+        self.transform_processes = len(ranges) > 1
+        yield from ranges
 
-    def transform(self):
+    def transform_task(self, batch):
         """
-                Adds a 'SingleLine' field to each address row by combining street and zip code.
-                This prepares the data for batch geocoding.
-                The original CSV is overwritten with the transformed version.
+                Adds a 'SingleLine' field to each address row in one byte range by combining
+                street and zip code. This prepares the data for batch geocoding.
+                The work is the module-level transform_range(), so worker processes only
+                import etl.ChunkedTransform.
+
+                Args:
+                    batch (tuple): (start, end) byte range of 'addresses.csv'.
+
+                Returns:
+                    tuple: (transform_range, args); the call returns the transformed rows as CSV bytes.
         """
-        print("Running base transform...")
+        start, end = batch
         input_csv = f"{self.config_dict.get('proj_dir')}addresses.csv"
-        temp_csv = f"{self.config_dict.get('proj_dir')}addresses_transformed.csv"
+        return transform_range, (input_csv, start, end, self.header, single_line)
 
-        with open(input_csv, mode="r", encoding="utf-8") as infile, open(temp_csv, mode="w", newline="", encoding="utf-8") as outfile:
-            reader = csv.DictReader(infile)
-            fieldnames = reader.fieldnames + ["SingleLine"]
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
+    def load(self, batch):
+        """
+                Appends one block of transformed rows to 'addresses_transformed.csv'.
+                Blocks arrive in input order.
 
-            for row in reader:
-                street = row.get("Street Address", "").strip()
-                zipcode = row.get("ZipCode", "").strip()
-                row["SingleLine"] = f"{street}, Boulder CO {zipcode}"
-                writer.writerow(row)
+                Args:
+                    batch (bytes): Output of transform().
+        """
+        if self._outfile is None:
+            temp_csv = f"{self.config_dict.get('proj_dir')}addresses_transformed.csv"
+            self._outfile = open(temp_csv, "wb")
+            self._outfile.write(write_rows([self.header + ["SingleLine"]]))
+        self._outfile.write(batch)
 
+    def abort(self):
+        """
+                Closes and removes the partial 'addresses_transformed.csv' after a failed run.
+        """
+        if self._outfile is not None:
+            self._outfile.close()
+            self._outfile = None
+            os.remove(f"{self.config_dict.get('proj_dir')}addresses_transformed.csv")
+
+    def finish(self):
+        """
+                Replaces 'addresses.csv' with the transformed version and geocodes it.
+        """
+        if self._outfile is None:
+            print("No addresses were transformed.")
+            return
+        self._outfile.close()
+        self._outfile = None
+
+        input_csv = f"{self.config_dict.get('proj_dir')}addresses.csv"
+        temp_csv = f"{self.config_dict.get('proj_dir')}addresses_transformed.csv"
         shutil.move(temp_csv, input_csv)
         print("SingleLine addresses added.")
 
         # ✅ Debug: print a sample row
         with open(input_csv, mode="r", encoding="utf-8") as f:
-            preview = next(csv.DictReader(f))
+            preview = next(csv.DictReader(f), None)
             print("Sample row to be geocoded:", preview)
 
-    def load(self):
+        self.geocode()
+
+    def geocode(self):
         """
                 Geocodes the addresses using the ArcGIS World Geocoding Service.
                 Outputs are saved to a feature class in the project geodatabase.
-                A backup copy is made to 'avoid_points'.
+                A backup copy is made to 'avoid_points', and the geocoded points are
+                saved as an AddressStore under 'store_dir' for the later pipeline stages.
         """
         print("Running base load...")
 
@@ -117,13 +184,11 @@ class GSheetsEtl(SpatialEtl):
             arcpy.management.CopyFeatures(geocoded_output, "avoid_points")
             print("Copied to 'avoid_points' in geodatabase")
 
+            store_path = f"{self.config_dict.get('proj_dir')}{self.config_dict.get('store_dir')}{geocoded_output}"
+            AddressStore.from_feature_class(
+                geocoded_output, ["Match_addr", "Postal"], arcpy.SpatialReference(2231)
+            ).save(store_path)
+            print(f"Saved address store to {store_path}")
+
         except Exception as e:
             print(f"Geocoding failed: {e}")
-
-    def process(self):
-        """
-                Executes the full ETL pipeline: extract, transform, and load.
-        """
-        self.extract()
-        self.transform()
-        self.load()
@@ -0,0 +1,40 @@
+import importlib
+
+
+class LazyModule:
+    """
+        LazyModule stands in for a module that is imported on first use.
+
+        Scripts that start GSheetsEtl's transform worker processes are re-imported
+        by each worker under the spawn start method. A top-level 'arcpy = lazy_import("arcpy")'
+        keeps module-level code and functions written against 'arcpy' unchanged, while
+        only the processes that actually use arcpy pay for loading it.
+    """
+
+    def __init__(self, name):
+        """
+                Initialize the LazyModule.
+
+                Args:
+                    name (str): Name of the module to import on first attribute access.
+        """
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        # Only called for attributes the proxy itself does not have, so every
+        # module attribute is looked up on the real module.
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+def lazy_import(name):
+    """
+        Returns a proxy for a module that imports it the first time one of its
+        attributes is used.
+
+        Args:
+            name (str): Module name, e.g. 'arcpy'.
+    """
+    return LazyModule(name)
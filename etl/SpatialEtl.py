@@ -1,13 +1,250 @@
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_DONE = object()
+
+
 class SpatialEtl:
-    def __init__(self, confif_dict):
-        self.config_dict=confif_dict
+    """
+        SpatialEtl is the base class for the project's ETL processes. It runs the
+        extract, transform and load stages as a pipeline: batches of records flow
+        between the stages through bounded queues, so the stages overlap and a slow
+        stage holds back the ones before it instead of letting batches pile up.
+
+        Subclasses implement the batch-level hooks and inherit the concurrency:
+            - extract(): generator yielding batches of records.
+            - transform(batch): returns the transformed batch.
+            - load(batch): writes one transformed batch.
+            - begin() / finish(): optional setup before and work after the pipeline.
+            - abort(): optional cleanup when a stage fails; finish() is not called then.
+
+        Each stage's concurrency is set by the class attributes below, or by the
+        'transform_workers' / 'load_workers' config keys (0 means one per CPU).
+        Subclasses whose load writes a single ordered output set ordered_load,
+        which pins load to one worker that receives batches in extract order.
 
+        Attributes:
+            config_dict (dict): Dictionary containing paths, URLs, and configuration parameters.
+            queue_size (int): Capacity of each queue between stages, in batches.
+            transform_workers (int): Number of concurrent transform workers.
+            transform_processes (bool): Run transform_task() in worker processes instead of
+                transform() in threads, for CPU-bound transforms. extract() may change it
+                before yielding its first batch, e.g. to stay in-process for small inputs.
+            load_workers (int): Number of concurrent load workers.
+            ordered_load (bool): Load in one worker, in extract order, whatever load_workers is.
+    """
+
+    queue_size = 4
+    transform_workers = 1
+    transform_processes = False
+    load_workers = 1
+    ordered_load = False
+
+    def __init__(self, config_dict):
+        self.config_dict = config_dict
+
+    def begin(self):
+        """
+                Called once before the pipeline starts.
+        """
 
     def extract(self):
+        """
+                Yields batches of records from the source.
+        """
         print(f"Extracting data from {self.config_dict.get('remote_url')} to {self.config_dict.get('proj_dir')}")
+        return iter(())
+
+    def transform(self, batch):
+        """
+                Transforms one batch. The base implementation runs transform_task() in-process.
+
+                Args:
+                    batch: A batch yielded by extract().
+        """
+        function, args = self.transform_task(batch)
+        return function(*args)
+
+    def transform_task(self, batch):
+        """
+                Describes the transform of one batch as a (function, args) pair that can be
+                sent to a worker process. Override it with a module-level function and plain
+                arguments so workers do not import the subclass's module or pickle the
+                instance. The base implementation passes the batch through unchanged.
+
+                Args:
+                    batch: A batch yielded by extract().
+        """
+        return _identity, (batch,)
+
+    def load(self, batch):
+        """
+                Loads one transformed batch.
+
+                Args:
+                    batch: A batch returned by transform().
+        """
+
+    def finish(self):
+        """
+                Called once after every batch has been loaded.
+        """
+
+    def abort(self):
+        """
+                Called instead of finish() when a stage fails, to release or remove
+                partial output.
+        """
+
+    def process(self):
+        """
+                Executes the full ETL pipeline: begin, the overlapping extract, transform
+                and load stages, and finish. The first error raised by any stage stops
+                the pipeline, runs abort() and is re-raised here.
+        """
+        self.begin()
+        try:
+            self._run_pipeline()
+        except BaseException:
+            self.abort()
+            raise
+        self.finish()
+
+    def _workers(self, stage):
+        if stage == "load" and self.ordered_load:
+            return 1
+        workers = self.config_dict.get(f"{stage}_workers")
+        if workers is None:
+            workers = getattr(self, f"{stage}_workers")
+        return workers or os.cpu_count() or 1
+
+    def _run_pipeline(self):
+        transform_workers = self._workers("transform")
+        load_workers = self._workers("load")
+        to_transform = queue.Queue(self.queue_size)
+        to_load = queue.Queue(self.queue_size)
+        stop = threading.Event()
+        errors = []
+        # Caps the batches between extract and load, which also bounds the
+        # reorder buffer used to keep a single loader in extract order.
+        in_flight = threading.Semaphore(2 * self.queue_size + transform_workers + load_workers)
+        pool = []
+        pool_lock = threading.Lock()
+        futures = set()
+
+        def run(stage):
+            # BaseException too: a stage that dies on SystemExit or similar must
+            # still stop the others, or the joins below would wait forever.
+            try:
+                stage()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+        def submit(batch):
+            with pool_lock:
+                if stop.is_set():
+                    return None
+                if not pool:
+                    pool.append(ProcessPoolExecutor(transform_workers))
+                function, args = self.transform_task(batch)
+                future = pool[0].submit(function, *args)
+                futures.add(future)
+            try:
+                return future.result()
+            finally:
+                futures.discard(future)
+
+        def extract_stage():
+            for seq, batch in enumerate(self.extract()):
+                while not in_flight.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if not _put(to_transform, (seq, batch), stop):
+                    return
+
+        def transform_stage():
+            while True:
+                item = _get(to_transform, stop)
+                if item is _DONE:
+                    return
+                seq, batch = item
+                if self.transform_processes:
+                    batch = submit(batch)
+                else:
+                    batch = self.transform(batch)
+                if not _put(to_load, (seq, batch), stop):
+                    return
+
+        def load_stage():
+            pending = {}
+            next_seq = 0
+            while True:
+                item = _get(to_load, stop)
+                if item is _DONE:
+                    return
+                if load_workers > 1:
+                    self.load(item[1])
+                    in_flight.release()
+                    continue
+                pending[item[0]] = item[1]
+                while next_seq in pending:
+                    self.load(pending.pop(next_seq))
+                    in_flight.release()
+                    next_seq += 1
+
+        try:
+            extractor = _start(run, extract_stage)
+            transformers = [_start(run, transform_stage) for _ in range(transform_workers)]
+            loaders = [_start(run, load_stage) for _ in range(load_workers)]
+
+            extractor.join()
+            for _ in transformers:
+                _put(to_transform, _DONE, stop)
+            for thread in transformers:
+                thread.join()
+            for _ in loaders:
+                _put(to_load, _DONE, stop)
+            for thread in loaders:
+                thread.join()
+        finally:
+            with pool_lock:
+                stop.set()
+                for future in list(futures):
+                    future.cancel()
+                if pool:
+                    pool[0].shutdown()
+
+        if errors:
+            raise errors[0]
+
+
+def _identity(batch):
+    return batch
+
+
+def _start(run, stage):
+    thread = threading.Thread(target=run, args=(stage,), daemon=True)
+    thread.start()
+    return thread
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
 
-    def transform(self):
-        print("Running base transform...")
 
-    def load(self):
-        print("Running base load...")
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
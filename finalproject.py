@@ -1,14 +1,20 @@
 import sys
 import os
 import logging
-import csv
-import arcpy
+import numpy as np
 
 sys.path.append(r"C:\Users\rburn\PycharmProjects\WNVOutbreakPyProject")
 
 from etl.GSheetsEtl import GSheetsEtl
+from etl.AddressStore import AddressStore
+from etl.AddressStatistics import compute_statistics, write_statistics
+from etl.LazyImport import lazy_import
 from config.config_utils import load_config
 
+# Imported on first use: under spawn, GSheetsEtl's transform worker processes
+# re-import this module as __mp_main__ and do not need arcpy.
+arcpy = lazy_import("arcpy")
+
 
 def etl(config):
     """
@@ -99,11 +105,11 @@ def erase_avoid_areas(intersect_fc, avoid_buffer_fc, output_fc):
 
 def spatial_join(address_fc, join_fc, output_fc):
     """
-        Performs a spatial join between addresses and spray-eligible areas.
+        Performs a spatial join between addresses and risk areas.
 
         Args:
             address_fc (str): Feature class of addresses.
-            join_fc (str): Feature class of spray zones.
+            join_fc (str): Feature class of risk areas.
             output_fc (str): Output feature class for joined results.
     """
     try:
@@ -120,41 +126,226 @@ def spatial_join(address_fc, join_fc, output_fc):
         logging.error(f"Error in spatial_join: {e}")
 
 
-def export_addresses_to_csv(fc, csv_path):
+def build_address_store(address_fc, config):
+    """
+        Reads an address feature class with one cursor pass into a compact columnar
+        AddressStore, projected to NAD 1983 StatePlane Colorado North (feet). The
+        store is rebuilt every run, so its oids always match the feature class that
+        the spatial join reads, and it is opened memory-mapped.
+
+        Args:
+            address_fc (str): Feature class of addresses.
+            config (dict): Configuration dictionary with project paths and field names.
+
+        Returns:
+            AddressStore: The memory-mapped store, or None on failure.
+    """
+    try:
+        logging.debug("Entering build_address_store()")
+        store_path = f"{config.get('proj_dir')}{config.get('store_dir')}{address_fc}"
+        fields = [config.get('address_field'), config.get('zip_field')]
+        AddressStore.from_feature_class(address_fc, fields, arcpy.SpatialReference(2231)).save(store_path)
+        store = AddressStore.load(store_path)
+        logging.info(f"Address store for {address_fc} saved to {store_path} ({len(store)} rows)")
+        logging.debug("Exiting build_address_store()")
+        return store
+    except Exception as e:
+        logging.error(f"Error in build_address_store: {e}")
+
+
+def select_joined_addresses(address_store, joined_fc, config):
+    """
+        Selects the rows of the address store that appear in a spatial join output.
+        Only the TARGET_FID column of the join output is read; all other address
+        data comes from the store. The selection is compacted to its own
+        vocabulary before it is saved.
+
+        Args:
+            address_store (AddressStore): Store built from the join's target features.
+            joined_fc (str): Feature class resulting from spatial join.
+            config (dict): Configuration dictionary with project paths.
+
+        Returns:
+            AddressStore: The memory-mapped store of joined addresses, or None on failure.
+    """
+    try:
+        logging.debug("Entering select_joined_addresses()")
+        target_fids = arcpy.da.TableToNumPyArray(joined_fc, ["TARGET_FID"])["TARGET_FID"]
+        selected = address_store.select_oids(target_fids)
+        expected = len(np.unique(target_fids))
+        if len(selected) != expected:
+            raise ValueError(f"{joined_fc} has {expected} target features but only {len(selected)} "
+                             f"match the address store; the store is out of date")
+        store_path = f"{config.get('proj_dir')}{config.get('store_dir')}{joined_fc}"
+        selected.compact().save(store_path)
+        joined_store = AddressStore.load(store_path)
+        logging.info(f"Address store for {joined_fc} saved to {store_path}")
+        logging.debug("Exiting select_joined_addresses()")
+        return joined_store
+    except Exception as e:
+        logging.error(f"Error in select_joined_addresses: {e}")
+
+
+def export_addresses_to_csv(address_store, csv_path, fields):
     """
-       Exports address data from a feature class to a CSV file.
+       Exports address data from an address store to a CSV file.
 
        Args:
-           fc (str): Input feature class with address data.
+           address_store (AddressStore): Store with the address data.
            csv_path (str): Full path to the output CSV file.
+           fields (list): Text columns of the store to export.
     """
     try:
-        fields = ["StreetAddress"]
-        with open(csv_path, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(fields)
-            with arcpy.da.SearchCursor(fc, fields) as cursor:
-                for row in cursor:
-                    writer.writerow(row)
+        address_store.to_csv(csv_path, fields)
         logging.info(f"Addresses exported to {csv_path}")
     except Exception as e:
         logging.error(f"Error in export_addresses_to_csv: {e}")
 
 
-def count_at_risk(joined_fc):
+def diff_target_addresses(target_store, config):
     """
-        Counts how many addresses fall within the spray-eligible area.
+        Compares this run's target addresses with the previous run's and exports
+        only the changes to target_addresses_added.csv and target_addresses_removed.csv.
+        Addresses are matched on a stable id hashed from street and zip code, and the
+        target set is kept sorted by that id, with only its own address vocabulary,
+        under the store directory for the next run; AddressStore.save() replaces
+        the previous index atomically. On the first run every target address is
+        reported as added.
 
         Args:
-            joined_fc (str): Feature class resulting from spatial join.
+            target_store (AddressStore): Store of the joined addresses.
+            config (dict): Configuration dictionary with project paths and field names.
+    """
+    try:
+        logging.debug("Entering diff_target_addresses()")
+        fields = [config.get('address_field'), config.get('zip_field')]
+        index_path = f"{config.get('proj_dir')}{config.get('store_dir')}Target_Addresses_index"
+
+        current = target_store.indexed(fields)
+        if AddressStore.exists(index_path):
+            added, removed = current.diff(AddressStore.load(index_path))
+        else:
+            added, removed = current, current.take(np.zeros(len(current), dtype=bool))
+
+        export_addresses_to_csv(added, f"{config.get('proj_dir')}target_addresses_added.csv", fields)
+        export_addresses_to_csv(removed, f"{config.get('proj_dir')}target_addresses_removed.csv", fields)
+        logging.info(f"Target addresses added: {len(added)}, removed: {len(removed)}")
+
+        current.save(index_path)
+        logging.debug("Exiting diff_target_addresses()")
+    except Exception as e:
+        logging.error(f"Error in diff_target_addresses: {e}")
+
+
+def union_risk_layers(risk_layers, avoid_buffer, output_fc):
+    """
+        Unions the buffered risk layers and the avoid buffer, keeping only the
+        FID_<layer> field of each input. A polygon of the union lies inside a layer
+        when its FID_<layer> is not -1, so one spatial join of the addresses against
+        the union tells both which risk layers cover an address and whether it is
+        in the spray area.
+
+        Args:
+            risk_layers (list): Buffered risk feature class names.
+            avoid_buffer (str): Buffered avoid points feature class name.
+            output_fc (str): Output feature class for the union.
+    """
+    try:
+        logging.debug("Entering union_risk_layers()")
+        logging.info(f"Creating union of {risk_layers} and {avoid_buffer} as {output_fc}...")
+        arcpy.Union_analysis(in_features=risk_layers + [avoid_buffer], out_feature_class=output_fc,
+                             join_attributes="ONLY_FID")
+        logging.debug("Exiting union_risk_layers()")
+    except Exception as e:
+        logging.error(f"Error in union_risk_layers: {e}")
+
+
+def select_target_addresses(risk_fc, risk_layers, avoid_buffer, output_fc):
+    """
+        Selects the addresses of a join against the union_risk_layers() output that
+        are inside every risk buffer and outside the avoid buffer, the same addresses
+        a join against the Spray_Eligible_Area keeps.
+
+        Args:
+            risk_fc (str): Spatial join output of addresses and the risk layer union.
+            risk_layers (list): Buffered risk feature class names.
+            avoid_buffer (str): Buffered avoid points feature class name.
+            output_fc (str): Output feature class for the target addresses.
+    """
+    try:
+        logging.debug("Entering select_target_addresses()")
+        where = " AND ".join([f"FID_{layer} >= 0" for layer in risk_layers] + [f"FID_{avoid_buffer} = -1"])
+        logging.info(f"Selecting {output_fc} from {risk_fc} where {where}")
+        arcpy.Select_analysis(in_features=risk_fc, out_feature_class=output_fc, where_clause=where)
+        logging.debug("Exiting select_target_addresses()")
+    except Exception as e:
+        logging.error(f"Error in select_target_addresses: {e}")
+
+
+def risk_layer_masks(risk_fc, address_store, risk_layers):
+    """
+        Finds which addresses fall inside each buffered risk layer by reading the
+        TARGET_FID and FID_<layer> columns of the risk layer join, so no further
+        pass over the addresses is needed.
+
+        Args:
+            risk_fc (str): Spatial join output of addresses and the risk layer union.
+            address_store (AddressStore): Store built from the join's target features.
+            risk_layers (list): Buffered risk feature class names.
+
+        Returns:
+            dict: Risk layer name -> boolean array aligned with the store rows, or None on failure.
+    """
+    try:
+        logging.debug("Entering risk_layer_masks()")
+        fid_fields = [f"FID_{layer}" for layer in risk_layers]
+        table = arcpy.da.TableToNumPyArray(risk_fc, ["TARGET_FID"] + fid_fields, null_value=-1)
+
+        oids = address_store.columns["oid"]
+        order = np.argsort(oids)
+        positions = np.searchsorted(oids, table["TARGET_FID"], sorter=order)
+        rows = order[np.minimum(positions, len(oids) - 1)]
+        matched = oids[rows] == table["TARGET_FID"]
+        masks = {}
+        for layer, field in zip(risk_layers, fid_fields):
+            mask = np.zeros(len(oids), dtype=bool)
+            mask[rows[matched]] = table[field][matched] >= 0
+            masks[layer] = mask
+        logging.debug("Exiting risk_layer_masks()")
+        return masks
+    except Exception as e:
+        logging.error(f"Error in risk_layer_masks: {e}")
+
+
+def summarize_at_risk(address_store, target_store, risk_masks, config):
+    """
+        Counts the addresses at risk and breaks them down by ZIP code, by risk-layer
+        combination and by distance to the nearest avoid point. The summary is
+        written to wnv_statistics.csv and wnv_statistics.json in the project directory.
+
+        Args:
+            address_store (AddressStore): Store of all addresses.
+            target_store (AddressStore): Store of the joined addresses.
+            risk_masks (dict): Output of risk_layer_masks(); None leaves the risk-layer
+                combinations out of the summary.
+            config (dict): Configuration dictionary with project paths and field names.
     """
     try:
-        logging.debug("Entering count_at_risk()")
-        count = int(arcpy.GetCount_management(joined_fc)[0])
-        logging.info(f"Number of addresses at risk: {count}")
-        logging.debug("Exiting count_at_risk()")
+        logging.debug("Entering summarize_at_risk()")
+        avoid_path = f"{config.get('proj_dir')}{config.get('store_dir')}geocoded_addresses"
+        avoid_store = AddressStore.load(avoid_path) if AddressStore.exists(avoid_path) else None
+
+        target_mask = np.isin(address_store.columns["oid"], target_store.columns["oid"])
+        stats = compute_statistics(address_store, target_mask, config.get('zip_field'),
+                                   risk_masks, avoid_store)
+        logging.info(f"Number of addresses at risk: {stats['target_addresses']}")
+
+        write_statistics(stats, f"{config.get('proj_dir')}wnv_statistics.csv",
+                         f"{config.get('proj_dir')}wnv_statistics.json")
+        logging.info(f"Statistics written to {config.get('proj_dir')}wnv_statistics.csv")
+        logging.debug("Exiting summarize_at_risk()")
     except Exception as e:
-        logging.error(f"Error in count_at_risk: {e}")
+        logging.error(f"Error in summarize_at_risk: {e}")
 
 
 def set_spatial_reference():
@@ -242,9 +433,10 @@ def main():
         Main driver function that runs the entire workflow including:
         - ETL process
         - Buffering
-        - Intersect and erase
-        - Spatial join
-        - Renderer, definition query, export to CSV and map layout.
+        - Intersect and erase for the map
+        - One spatial join against the union of the buffers, and target selection
+        - Renderer, definition query, export to CSV and map layout
+        - Diff of target addresses against the previous run.
     """
     try:
         config = load_config()
@@ -288,15 +480,24 @@ def main():
         erase_avoid_areas(intersect_output, avoid_buffer, sprayed_area)
 
         address_fc = "Boulder_addresses"
+        risk_union = "Risk_Layers_Union"
+        risk_output = "Risk_Addresses"
         joined_output = "Target_Addresses"
-        spatial_join(address_fc, sprayed_area, joined_output)
+        address_store = build_address_store(address_fc, config)
+        union_risk_layers(buffer_outputs, avoid_buffer, risk_union)
+        spatial_join(address_fc, risk_union, risk_output)
+        select_target_addresses(risk_output, buffer_outputs, avoid_buffer, joined_output)
+        target_store = select_joined_addresses(address_store, joined_output, config)
 
         apply_simple_renderer("final_analysis")
         apply_definition_query("Target_Addresses")
 
-        count_at_risk(joined_output)
+        summarize_at_risk(address_store, target_store,
+                          risk_layer_masks(risk_output, address_store, buffer_outputs), config)
 
-        export_addresses_to_csv(joined_output, f"{config.get('proj_dir')}target_addresses.csv")
+        export_addresses_to_csv(target_store, f"{config.get('proj_dir')}target_addresses.csv",
+                                [config.get('address_field')])
+        diff_target_addresses(target_store, config)
 
         exportMap(config)
 
@@ -4,10 +4,14 @@ import logging
 
 sys.path.append(r"C:\Users\rburn\PycharmProjects\WNVOutbreakPyProject")
 
-import arcpy
 from etl.GSheetsEtl import GSheetsEtl
+from etl.LazyImport import lazy_import
 from config.config_utils import load_config
 
+# Imported on first use: under spawn, GSheetsEtl's transform worker processes
+# re-import this module as __mp_main__ and do not need arcpy.
+arcpy = lazy_import("arcpy")
+
 
 def etl(config):
     logging.debug("Entering etl()")
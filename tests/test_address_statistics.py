@@ -0,0 +1,63 @@
+import csv
+import json
+
+import numpy as np
+
+from etl.AddressStatistics import compute_statistics, write_statistics
+from etl.AddressStore import AddressStore, _pack
+
+
+def make_store(zips, xs):
+    lookup = {}
+    columns = {"oid": np.arange(1, len(zips) + 1, dtype=np.int64),
+               "x": np.asarray(xs, dtype=np.float64), "y": np.zeros(len(zips)),
+               "ZipCode": np.array([lookup.setdefault(z, len(lookup)) for z in zips], dtype=np.int32)}
+    return AddressStore(columns, {"ZipCode": _pack(lookup.keys())})
+
+
+def test_counts_by_zip_risk_combination_and_avoid_distance():
+    store = make_store(["80301", "80301", "80302", "80302", "80303"], [0, 1000, 2000, 6000, 30000])
+    target_mask = np.array([True, False, True, True, False])
+    risk_masks = {"Wetlands": np.array([True, True, True, True, False]),
+                  "Lakes": np.array([True, False, True, True, False])}
+    avoid_store = make_store(["80301"], [-1000])
+
+    stats = compute_statistics(store, target_mask, "ZipCode", risk_masks, avoid_store)
+
+    assert stats["total_addresses"] == 5 and stats["target_addresses"] == 3
+    assert stats["by_zip"] == [{"zip": "80301", "addresses": 2, "targets": 1},
+                               {"zip": "80302", "addresses": 2, "targets": 2},
+                               {"zip": "80303", "addresses": 1, "targets": 0}]
+    assert stats["by_risk_combination"] == [
+        {"layers": [], "addresses": 1, "targets": 0},
+        {"layers": ["Wetlands"], "addresses": 1, "targets": 0},
+        {"layers": ["Wetlands", "Lakes"], "addresses": 3, "targets": 3},
+    ]
+    # Targets are 1000, 3000 and 7000 feet from the avoid point.
+    assert [row["targets"] for row in stats["by_avoid_distance"]] == [1, 0, 1, 1, 0, 0]
+    assert stats["by_avoid_distance"][-1] == {"min_feet": 20000, "max_feet": None, "targets": 0}
+
+
+def test_empty_store_and_no_avoid_store():
+    stats = compute_statistics(make_store([], []), np.zeros(0, dtype=bool), "ZipCode",
+                               {"Wetlands": np.zeros(0, dtype=bool)})
+
+    assert stats["total_addresses"] == 0 and stats["target_addresses"] == 0
+    assert stats["by_zip"] == []
+    assert stats["by_risk_combination"] == []
+    assert stats["by_avoid_distance"] == []
+
+
+def test_missing_risk_masks_are_left_out(tmp_path):
+    store = make_store(["80301", "80302"], [0, 0])
+    stats = compute_statistics(store, np.array([True, False]), "ZipCode", None)
+    csv_path, json_path = str(tmp_path / "stats.csv"), str(tmp_path / "stats.json")
+
+    write_statistics(stats, csv_path, json_path)
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["group", "key", "addresses", "targets"], ["total", "", "2", "1"],
+                    ["zip", "80301", "1", "1"], ["zip", "80302", "1", "0"]]
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f)["by_risk_combination"] is None
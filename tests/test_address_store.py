@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from etl.AddressStore import AddressStore, _pack
+
+FIELDS = ["StreetAddress", "ZipCode"]
+
+
+def make_store(streets, zips):
+    columns = {"oid": np.arange(1, len(streets) + 1, dtype=np.int64),
+               "x": np.zeros(len(streets)), "y": np.zeros(len(streets))}
+    vocabularies = {}
+    for name, values in zip(FIELDS, (streets, zips)):
+        lookup = {}
+        columns[name] = np.array([lookup.setdefault(v, len(lookup)) for v in values], dtype=np.int32)
+        vocabularies[name] = _pack(lookup.keys())
+    return AddressStore(columns, vocabularies)
+
+
+def test_diff_reports_added_and_removed_addresses(tmp_path):
+    county = make_store([f"{i} Main St" for i in range(100)], ["80301"] * 100)
+    path = str(tmp_path / "index")
+
+    county.take(np.arange(0, 10)).indexed(FIELDS).save(path)
+    previous = AddressStore.load(path)
+    added, removed = county.take(np.arange(3, 12)).indexed(FIELDS).diff(previous)
+
+    assert sorted(added.decode("StreetAddress")) == ["10 Main St", "11 Main St"]
+    assert sorted(removed.decode("StreetAddress")) == ["0 Main St", "1 Main St", "2 Main St"]
+
+
+def test_address_ids_ignore_case_and_spacing():
+    a = make_store(["1 Main St"], ["80301"])
+    b = make_store(["1  MAIN st"], ["80301"])
+    assert a.address_ids(FIELDS)[0] == b.address_ids(FIELDS)[0]
+
+
+def test_index_keeps_only_its_own_vocabulary():
+    county = make_store([f"{i} Main St" for i in range(100)], ["80301"] * 100)
+    index = county.take(np.array([5, 50])).indexed(FIELDS)
+    offsets, _ = index.vocabularies["StreetAddress"]
+    assert len(offsets) - 1 == 2
+    assert sorted(index.decode("StreetAddress")) == ["5 Main St", "50 Main St"]
+
+
+def test_save_replaces_previous_version_while_it_is_loaded(tmp_path):
+    path = str(tmp_path / "index")
+    make_store(["1 Main St"], ["80301"]).save(path)
+    previous = AddressStore.load(path)
+
+    make_store(["2 Oak St", "3 Elm St"], ["80302", "80303"]).save(path)
+
+    assert previous.decode("StreetAddress") == ["1 Main St"]
+    assert AddressStore.load(path).decode("StreetAddress") == ["2 Oak St", "3 Elm St"]
+    assert len([name for name in os.listdir(path) if name != "CURRENT"]) == 1
+
+
+def test_save_removes_only_old_versions(tmp_path):
+    path = str(tmp_path / "index")
+    make_store(["1 Main St"], ["80301"]).save(path)
+    os.makedirs(os.path.join(path, "keepme"))
+    with open(os.path.join(path, "CURRENT." + "0" * 32), "w") as f:
+        f.write("0" * 32)
+
+    make_store(["2 Oak St"], ["80302"]).save(path)
+
+    with open(os.path.join(path, "CURRENT")) as f:
+        current = f.read()
+    assert sorted(os.listdir(path)) == sorted(["CURRENT", current, "keepme"])
@@ -0,0 +1,115 @@
+import csv
+
+import pytest
+
+from etl import ChunkedTransform
+from etl.ChunkedTransform import split_csv, transform_range, write_rows, single_line
+
+
+def serial_transform(input_csv, output_csv):
+    # The row-by-row DictReader/DictWriter loop GSheetsEtl.transform used before chunking.
+    with open(input_csv, mode="r", encoding="utf-8") as infile, \
+            open(output_csv, mode="w", newline="", encoding="utf-8") as outfile:
+        reader = csv.DictReader(infile)
+        writer = csv.DictWriter(outfile, fieldnames=reader.fieldnames + ["SingleLine"])
+        writer.writeheader()
+        for row in reader:
+            street = row.get("Street Address", "").strip()
+            zipcode = row.get("ZipCode", "").strip()
+            row["SingleLine"] = f"{street}, Boulder CO {zipcode}"
+            writer.writerow(row)
+
+
+def chunked_transform(input_csv, chunk_bytes):
+    header, ranges = split_csv(input_csv, chunk_bytes)
+    blocks = [write_rows([header + ["SingleLine"]])]
+    blocks += [transform_range(input_csv, start, end, header, single_line) for start, end in ranges]
+    return b"".join(blocks)
+
+
+def assert_matches_serial(tmp_path, content):
+    input_csv = tmp_path / "addresses.csv"
+    input_csv.write_bytes(content)
+    serial_csv = tmp_path / "serial.csv"
+    serial_transform(input_csv, serial_csv)
+    expected = serial_csv.read_bytes()
+    for chunk_bytes in (1, 2, 3, 5, 7, 11, 64, 1 << 20):
+        assert chunked_transform(input_csv, chunk_bytes) == expected, chunk_bytes
+
+
+def test_plain_rows(tmp_path):
+    content = b"Street Address,ZipCode\n" + b"".join(
+        f"{i} Main St,8030{i % 9}\n".encode() for i in range(50)
+    )
+    assert_matches_serial(tmp_path, content)
+
+
+def test_quoted_fields_with_newlines_and_escaped_quotes(tmp_path):
+    content = (
+        b'Name,"Street Address",ZipCode\r\n'
+        b'"multi\r\nline",1 Elm St,80301\r\n'
+        b'"say ""hi""\nthere",2 Oak St,80302\r\n'
+        b'"a,b",3 Pine St ,80303\r\n'
+        b'\r\n'
+        b'plain,"4 Ash\nSt",80304\r\n'
+    )
+    assert_matches_serial(tmp_path, content)
+
+
+def test_stray_quote_in_unquoted_field(tmp_path):
+    # A quote that does not start a field is literal, so it must not be taken
+    # as opening a quoted field that swallows the following rows.
+    content = (
+        b"Street Address,ZipCode\n"
+        b'5" pipe rd,1\n'
+        b"x,2\n"
+        b'"3\nC",3\n'
+        b'ab"cd,4\n'
+        b'"q"tail,5\n'
+    )
+    assert_matches_serial(tmp_path, content)
+
+
+def test_scan_blocks_split_quoted_fields(tmp_path, monkeypatch):
+    # Row boundaries found block by block must match a scan of the whole file,
+    # with blocks ending inside quoted fields and between adjacent quotes.
+    monkeypatch.setattr(ChunkedTransform, "SCAN_BYTES", 3)
+    content = (
+        b'Street Address,ZipCode\n'
+        b'"1 ""Elm""\nSt",80301\n'
+        b'"a"",""\n",80302\n'
+        b'2 Oak"St,"80303"\n'
+    )
+    assert_matches_serial(tmp_path, content)
+
+
+def test_unterminated_quote_falls_back_to_single_range(tmp_path):
+    input_csv = tmp_path / "addresses.csv"
+    input_csv.write_bytes(b'Street Address,ZipCode\n1 Main,1\n"2 Oak\n,2\n3 Elm,3\n')
+    header, ranges = split_csv(input_csv, 1)
+    assert header == ["Street Address", "ZipCode"]
+    assert ranges == [(len(b"Street Address,ZipCode\n"), input_csv.stat().st_size)]
+
+
+def test_short_rows_are_padded(tmp_path):
+    input_csv = tmp_path / "addresses.csv"
+    input_csv.write_bytes(b"Name,Street Address,ZipCode\nBob,1 Main St\n")
+    header, ranges = split_csv(input_csv, 1)
+    rows = list(csv.reader(transform_range(input_csv, *ranges[0], header, single_line)
+                           .decode("utf-8").splitlines()))
+    assert rows == [["Bob", "1 Main St", "", "1 Main St, Boulder CO "]]
+
+
+def test_long_rows_are_rejected(tmp_path):
+    input_csv = tmp_path / "addresses.csv"
+    input_csv.write_bytes(b"Street Address,ZipCode\n1 Main St,80301,extra\n")
+    header, ranges = split_csv(input_csv, 1)
+    with pytest.raises(ValueError, match="3 fields"):
+        transform_range(input_csv, *ranges[0], header, single_line)
+
+
+def test_empty_file_is_rejected(tmp_path):
+    input_csv = tmp_path / "addresses.csv"
+    input_csv.write_bytes(b"")
+    with pytest.raises(ValueError):
+        split_csv(input_csv)
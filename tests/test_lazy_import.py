@@ -0,0 +1,12 @@
+import sys
+
+from etl.LazyImport import lazy_import
+
+
+def test_module_is_imported_on_first_attribute_access(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    colorsys = lazy_import("colorsys")
+    assert "colorsys" not in sys.modules
+
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
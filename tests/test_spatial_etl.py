@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+
+import pytest
+
+from etl.SpatialEtl import SpatialEtl
+
+
+def square(value):
+    return value * value
+
+
+class NumbersEtl(SpatialEtl):
+    # Extracts 0..count-1, squares them with randomly delayed transforms so they
+    # finish out of order, and records what load receives.
+
+    transform_workers = 4
+
+    def __init__(self, config_dict, count=40, fail_at=None, fail_stage=None):
+        super().__init__(config_dict)
+        self.count = count
+        self.fail_at = fail_at
+        self.fail_stage = fail_stage
+        self.extracted = 0
+        self.loaded = []
+        self.max_ahead = 0
+        self.finished = False
+        self.aborted = False
+
+    def extract(self):
+        for value in range(self.count):
+            if self.fail_stage == "extract" and value == self.fail_at:
+                raise RuntimeError("extract failed")
+            if self.fail_stage == "exit" and value == self.fail_at:
+                raise SystemExit("extract exited")
+            self.extracted += 1
+            self.max_ahead = max(self.max_ahead, self.extracted - len(self.loaded))
+            yield value
+
+    def transform(self, batch):
+        if self.fail_stage == "transform" and batch == self.fail_at:
+            raise RuntimeError("transform failed")
+        time.sleep(random.random() * 0.005)
+        return super().transform(batch)
+
+    def transform_task(self, batch):
+        return square, (batch,)
+
+    def load(self, batch):
+        if self.fail_stage == "load" and batch == square(self.fail_at):
+            raise RuntimeError("load failed")
+        self.loaded.append(batch)
+
+    def finish(self):
+        self.finished = True
+
+    def abort(self):
+        self.aborted = True
+
+
+class ProcessNumbersEtl(NumbersEtl):
+    transform_processes = True
+
+
+def test_single_loader_receives_batches_in_extract_order():
+    etl = NumbersEtl({})
+    etl.process()
+    assert etl.loaded == [square(value) for value in range(etl.count)]
+    assert etl.finished and not etl.aborted
+
+
+def test_process_transform_keeps_extract_order():
+    etl = ProcessNumbersEtl({"transform_workers": 2})
+    etl.process()
+    assert etl.loaded == [square(value) for value in range(etl.count)]
+
+
+@pytest.mark.parametrize("stage", ["extract", "transform", "load"])
+def test_first_error_is_reraised_and_aborts(stage):
+    etl = NumbersEtl({}, fail_at=7, fail_stage=stage)
+    with pytest.raises(RuntimeError, match=f"{stage} failed"):
+        etl.process()
+    assert etl.aborted and not etl.finished
+
+
+def test_base_exception_stops_the_pipeline():
+    etl = NumbersEtl({}, fail_at=7, fail_stage="exit")
+    with pytest.raises(SystemExit):
+        etl.process()
+    assert etl.aborted and not etl.finished
+
+
+def test_process_transform_error_is_reraised():
+    etl = ProcessNumbersEtl({"transform_workers": 2}, count=5)
+    etl.transform_task = lambda batch: (square, ("x" if batch == 3 else batch,))
+    with pytest.raises(TypeError):
+        etl.process()
+    assert etl.aborted
+
+
+def test_extract_is_held_back_by_a_slow_loader():
+    class SlowLoadEtl(NumbersEtl):
+        transform_workers = 1
+        queue_size = 2
+
+        def load(self, batch):
+            time.sleep(0.002)
+            super().load(batch)
+
+    etl = SlowLoadEtl({}, count=60)
+    etl.process()
+    # In-flight cap (queues plus one batch per worker), plus the batch the
+    # generator has yielded while extract waits for a free slot.
+    assert etl.max_ahead <= 2 * etl.queue_size + 1 + 1 + 1
+
+
+def test_ordered_load_ignores_load_workers_config():
+    class OrderedEtl(NumbersEtl):
+        ordered_load = True
+
+        def __init__(self, config_dict):
+            super().__init__(config_dict)
+            self.threads = set()
+
+        def load(self, batch):
+            self.threads.add(threading.get_ident())
+            super().load(batch)
+
+    etl = OrderedEtl({"load_workers": 0})
+    etl.process()
+    assert len(etl.threads) == 1
+    assert etl.loaded == [square(value) for value in range(etl.count)]